@@ -1,12 +1,29 @@
 import streamlit as st
+from streamlit.runtime.scriptrunner import StopException, add_script_run_ctx, get_script_run_ctx
 import pandas as pd
-from sklearn.ensemble import RandomForestRegressor
 from ml_food_recommender import MLFoodRecommender
+from calorie_model import load_training_data, train_forest
+from model_distillation import distill
+from incremental_model import (MAX_WORKOUT_CALORIES, IncrementalUpdater, SessionLog, plausible_calories,
+                               with_logged_workouts)
+from shared_model import ModelHost
+from stage_executor import StageExecutor
+from prediction_cache import PredictionCache
+from calorie_sweep import sweep_calories, sweep_chart_data
+from forest_uncertainty import predict_distribution
 from theme_handler import init_session_state, apply_theme
+import os
+import threading
 import warnings
 
 warnings.filterwarnings('ignore')
 
+MAX_STUDENT_MAE = 5.0  # kcal; mean disagreement allowed between student and forest
+# When set, worker processes share one published forest from this directory
+MODEL_DIR = os.environ.get("FITNESS_MODEL_DIR")
+STAGE_TIMEOUT = 60  # seconds a Submit waits for its sections before showing fallbacks
+BASELINE_HOLDOUT_SIZE = 1000  # training rows left out of the forest to measure drift on
+
 # Initialize session state and apply theme
 init_session_state()
 
@@ -40,32 +57,26 @@ with st.container():
 
 st.sidebar.header("User Input Parameters")
 
-@st.cache_resource(ttl=3600)
+@st.cache_resource
+def get_session_log():
+    X_train, _ = load_training_data("calories.csv", "exercise.csv")
+    return SessionLog("session_log.csv", X_train.columns)
+
+@st.cache_resource
+def load_training_split():
+    # The baseline holdout is split off before any fit, so drift is measured on unseen rows
+    X, y = load_training_data("calories.csv", "exercise.csv")
+    holdout = X.sample(n=min(BASELINE_HOLDOUT_SIZE, len(X) // 5), random_state=0).index
+    return X.drop(index=holdout), y.drop(index=holdout), X.loc[holdout], y.loc[holdout]
+
+@st.cache_resource
 def load_model():
     try:
-        calories = pd.read_csv("calories.csv")
-        exercise = pd.read_csv("exercise.csv")
-        
-        if len(calories) == 0 or len(exercise) == 0:
-            raise ValueError("Data files are empty")
-            
-        exercise_df = exercise.merge(calories, on="User_ID").drop(columns="User_ID")
-        exercise_df["BMI"] = round(exercise_df["Weight"] / ((exercise_df["Height"] / 100) ** 2), 2)
-        exercise_df["Gender"] = exercise_df["Gender"].map({"Male": 1, "Female": 0})
-        exercise_df = pd.get_dummies(exercise_df, columns=["Activity_Level"], drop_first=True)
-        
-        X_train = exercise_df.drop("Calories", axis=1)
-        y_train = exercise_df["Calories"]
-        
-        model = RandomForestRegressor(
-            n_estimators=200,
-            max_features=3,
-            max_depth=6,
-            n_jobs=-1,
-            random_state=42
-        )
-        model.fit(X_train, y_train)
-        return model
+        X_train, y_train, _, _ = load_training_split()
+        # Workouts logged before this start are part of the full fit; the
+        # updater only folds in the ones logged afterwards
+        X_train, y_train = with_logged_workouts(X_train, y_train, get_session_log().read_all())
+        return train_forest(X_train, y_train)
         
     except FileNotFoundError as e:
         st.error(f"Data file missing: {e}")
@@ -74,6 +85,80 @@ def load_model():
         st.error(f"Model initialization failed: {e}")
         st.stop()
 
+def train_for_publish():
+    # Logged workouts are part of every published forest, as in load_model()
+    X_train, y_train = load_training_data("calories.csv", "exercise.csv")
+    X_train, y_train = with_logged_workouts(X_train, y_train, get_session_log().read_all())
+    return train_forest(X_train, y_train), X_train
+
+@st.cache_resource
+def get_model_host():
+    return ModelHost(MODEL_DIR, train_for_publish)
+
+@st.cache_resource
+def get_updater():
+    # Folds logged workouts into the forest in the background
+    model = load_model()
+    X_train, y_train, X_holdout, y_holdout = load_training_split()
+    updater = IncrementalUpdater(
+        model,
+        get_session_log(),
+        baseline_holdout=X_holdout,
+        baseline_targets=y_holdout,
+        replay_X=X_train,
+        replay_y=y_train,
+        make_scorer=build_scorer
+    )
+    updater.start()
+    return updater
+
+def build_scorer(teacher):
+    # Compact student distilled from the forest; the forest stays the
+    # reference model and is used whenever the student drifts too far from it.
+    # Called at startup and by the updater thread, never inside a Submit.
+    try:
+        X_train, _, _, _ = load_training_split()
+        student, report = distill(teacher, reference=X_train)
+    except Exception as e:
+        print(f"Error in build_scorer: {str(e)}")
+        return teacher
+    if report.mae > MAX_STUDENT_MAE:
+        print(f"Student MAE {report.mae:.2f} kcal exceeds {MAX_STUDENT_MAE} kcal; scoring with the forest")
+        return teacher
+    return student
+
+@st.cache_resource(max_entries=2)
+def load_hosted_scorer(_forest, version):
+    # Hosted workers use the student published next to the shared forest
+    # instead of distilling their own
+    if _forest.student is None:
+        print(f"No student published for model version {version}; scoring with the forest")
+        return _forest
+    if _forest.student_report['mae'] > MAX_STUDENT_MAE:
+        print(f"Student MAE {_forest.student_report['mae']:.2f} kcal exceeds {MAX_STUDENT_MAE} kcal; "
+              "scoring with the forest")
+        return _forest
+    return _forest.student
+
+def current_models():
+    # Hosted workers map the forest published to MODEL_DIR; otherwise each
+    # process keeps its own copy, updated from logged workouts. Either way
+    # the scorer is returned together with the forest it was built from.
+    if MODEL_DIR:
+        forest = get_model_host().current()
+        return forest, load_hosted_scorer(forest, forest.version_)
+    return get_updater().snapshot()
+
+@st.cache_resource
+def get_stage_executor():
+    # One pool per process; Submit stages from every session share it
+    return StageExecutor(max_workers=8)
+
+@st.cache_resource
+def get_prediction_cache():
+    # One cache per process, shared by every session
+    return PredictionCache(maxsize=4096)
+
 def validate_inputs(age, height, weight, duration):
     errors = []
     if height < 100 or height > 250:
@@ -170,8 +255,113 @@ def user_input_features():
         }
         return pd.DataFrame(data_model, index=[0]), bmi_category, bmi_color, food_suggestions, diet_preference, submit
 
+def with_script_context(fn):
+    # Stage threads need the session's script context to use the st caches;
+    # it is detached again when the stage returns so pooled threads don't
+    # carry this session into the next one's stages
+    ctx = get_script_run_ctx()
+    def run():
+        thread = threading.current_thread()
+        # add_script_run_ctx(thread, None) re-attaches the thread's own context
+        # instead of clearing it, so remove whatever attributes attaching added
+        attached_before = set(vars(thread))
+        add_script_run_ctx(thread, ctx)
+        attached = set(vars(thread)) - attached_before
+        try:
+            return fn()
+        except StopException as e:
+            # st.stop() inside a stage (e.g. load_model failing) only fails that stage
+            raise RuntimeError("Stage stopped by st.stop()") from e
+        finally:
+            for name in attached:
+                delattr(thread, name)
+    return run
+
+def predict_calories(df):
+    random_reg, scorer = current_models()
+    df_model = df.reindex(columns=random_reg.feature_names_in_, fill_value=0)
+    return {
+        'calories': get_prediction_cache().predict(scorer, df_model)[0],
+        'spread': predict_distribution(random_reg, df_model, quantiles=(0.05, 0.95)),
+        'sweep': sweep_calories(scorer, df),
+        'history': [] if MODEL_DIR else get_updater().history
+    }
+
+def recommend_meals(bmi_category, activity_level, diet_preference):
+    recommender = MLFoodRecommender()
+    return recommender.get_recommendations(
+        bmi_category=bmi_category,
+        activity_level=activity_level,
+        diet_preference=diet_preference,
+        n_recommendations=5
+    )
+
+def render_calorie_prediction(df, prediction):
+    calories = prediction['calories']
+    spread = prediction['spread']
+    low, high = spread['quantiles'][0]
+    cal_col1, cal_col2 = st.columns(2)
+    with cal_col1:
+        st.metric(label="Estimated Calories Burned", 
+                 value=f"{round(calories, 2)} kcal",
+                 delta=f"~{round(calories/30, 2)} kcal/min")
+    with cal_col2:
+        st.metric(label="90% Tree Interval",
+                 value=f"{low:.0f} – {high:.0f} kcal",
+                 delta=f"± {spread['std'][0]:.1f} kcal (std)",
+                 delta_color="off")
+    
+    st.progress(min(int(df['Duration'].values[0]/120*100), 100))
+    st.caption(f"Based on {df['Duration'].values[0]} minutes of activity")
+    history = prediction['history']
+    accepted = [u for u in history if u['accepted']]
+    if accepted:
+        st.caption(f"Model refreshed with {sum(u['n_new'] for u in accepted)} logged workouts "
+                   f"(latest baseline MAE change: {accepted[-1].get('baseline_mae_change', 0.0):+.2f} kcal)")
+
+    sweep = prediction['sweep']
+    if 'Activity_Level' in sweep.columns:
+        st.write("#### What-if: Duration, Activity Level and Heart Rate")
+        st.caption("Each line holds your other inputs fixed and varies one activity level and heart-rate band")
+    else:
+        st.write("#### What-if: Duration and Heart Rate")
+        st.caption("Each line holds your other inputs fixed and varies one heart-rate band")
+    st.line_chart(sweep_chart_data(sweep), x_label="Duration (min)", y_label="Calories (kcal)")
+
+def render_meals(recommendations):
+    for i, rec in enumerate(recommendations['recommendations'], 1):
+        with st.container():
+            col1, col2 = st.columns([2, 3])
+            with col1:
+                st.markdown(f"#### {i}. {rec['food'].title()}")
+                st.caption(f"**Meal Type:** {rec['meal_type'].title()}")
+            
+            with col2:
+                nut = rec['nutrition']
+                st.markdown("**Nutrition per serving:**")
+                nut_cols = st.columns(4)
+                nut_cols[0].metric("Calories", f"{nut['calories']}")
+                nut_cols[1].metric("Protein", nut['protein'])
+                nut_cols[2].metric("Carbs", nut['carbs'])
+                nut_cols[3].metric("Fat", nut['fat'])
+        
+        if i < len(recommendations['recommendations']):
+            st.markdown("---")
+
 df, bmi_category, bmi_color, food_suggestions, diet_preference, submit = user_input_features()
 
+with st.sidebar:
+    if st.checkbox("Log a measured workout"):
+        measured_calories = st.number_input("Measured Calories Burned (kcal):",
+                                            min_value=0.0, max_value=MAX_WORKOUT_CALORIES, value=0.0, step=1.0)
+        if st.button("Save Workout"):
+            if not plausible_calories([measured_calories])[0]:
+                st.error(f"Measured calories must be between 1 and {MAX_WORKOUT_CALORIES:.0f} kcal")
+            elif validate_inputs(df["Age"].values[0], df["Height"].values[0],
+                                 df["Weight"].values[0], df["Duration"].values[0]):
+                get_session_log().append(df, [measured_calories])
+                st.success("Workout logged!")
+
 if submit:
     if not validate_inputs(df["Age"].values[0], df["Height"].values[0], 
                          df["Weight"].values[0], df["Duration"].values[0]):
@@ -198,34 +388,20 @@ if submit:
         
         with st.expander("Calorie Prediction", expanded=True):
             st.write("### Predicted Calories Burned:")
-            with st.spinner('Calculating...'):
-                random_reg = load_model()
-                df_model = df.reindex(columns=random_reg.feature_names_in_, fill_value=0)
-                calories = random_reg.predict(df_model)
-                st.metric(label="Estimated Calories Burned", 
-                         value=f"{round(calories[0], 2)} kcal",
-                         delta=f"~{round(calories[0]/30, 2)} kcal/min")
-            
-            st.progress(min(int(df['Duration'].values[0]/120*100), 100))
-            st.caption(f"Based on {df['Duration'].values[0]} minutes of activity")
+            calorie_slot = st.empty()
+            calorie_slot.info("Calculating...")
+        
+        stages = {'calories': with_script_context(lambda: predict_calories(df))}
         
         if food_suggestions:
             with st.expander("🍽️ Personalized Food Recommendations", expanded=True):
-                recommender = MLFoodRecommender()
-                
                 activity_mapping = {
                     'No activity': 'sedentary',
                     'Light walking': 'light',
                     'Regular exercise': 'moderate'
                 }
                 activity_level_str = activity_mapping.get(df['Activity_Level'].values[0], 'moderate')
-                
-                recommendations = recommender.get_recommendations(
-                    bmi_category=bmi_category,
-                    activity_level=activity_level_str,
-                    diet_preference=diet_preference if diet_preference else 'No preference',
-                    n_recommendations=5
-                )
+                diet_label = diet_preference if diet_preference else 'No preference'
                 
                 st.write("### 🎯 Based on your profile:")
                 cols = st.columns(3)
@@ -234,29 +410,12 @@ if submit:
                 with cols[1]:
                     st.metric("Activity Level", activity_level_str.title())
                 with cols[2]:
-                    st.metric("Diet Preference", diet_preference if diet_preference else 'No preference')
+                    st.metric("Diet Preference", diet_label)
                 
                 st.markdown("---")
                 st.subheader("🍽️ Recommended Meals")
-                
-                for i, rec in enumerate(recommendations['recommendations'], 1):
-                    with st.container():
-                        col1, col2 = st.columns([2, 3])
-                        with col1:
-                            st.markdown(f"#### {i}. {rec['food'].title()}")
-                            st.caption(f"**Meal Type:** {rec['meal_type'].title()}")
-                        
-                        with col2:
-                            nut = rec['nutrition']
-                            st.markdown("**Nutrition per serving:**")
-                            nut_cols = st.columns(4)
-                            nut_cols[0].metric("Calories", f"{nut['calories']}")
-                            nut_cols[1].metric("Protein", nut['protein'])
-                            nut_cols[2].metric("Carbs", nut['carbs'])
-                            nut_cols[3].metric("Fat", nut['fat'])
-                    
-                    if i < len(recommendations['recommendations']):
-                        st.markdown("---")
+                meal_slot = st.empty()
+                meal_slot.info("Finding meals for you...")
                 
                 st.markdown("---")
                 st.subheader("💡 Nutrition Tips")
@@ -279,6 +438,26 @@ if submit:
                     - Stay consistent with your healthy eating patterns
                     - Listen to your body's hunger and fullness cues
                     """)
+            
+            stages['recommendations'] = with_script_context(
+                lambda: recommend_meals(bmi_category, activity_level_str, diet_label)
+            )
+        
+        # Prediction and recommendations run side by side; each section is
+        # filled in as soon as its stage finishes
+        for result in get_stage_executor().run(stages, timeout=STAGE_TIMEOUT):
+            if result.name == 'calories':
+                with calorie_slot.container():
+                    if result.ok:
+                        render_calorie_prediction(df, result.value)
+                    else:
+                        st.warning("⚠️ Calorie prediction is unavailable right now. Please try again shortly.")
+            else:
+                with meal_slot.container():
+                    if result.ok:
+                        render_meals(result.value)
+                    else:
+                        st.warning("⚠️ Meal suggestions are unavailable right now. Please try again shortly.")
 
 # Footer
 st.markdown("---")
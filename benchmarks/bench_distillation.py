@@ -0,0 +1,65 @@
+"""Compare the distilled student against the forest teacher.
+
+Run from the repository root:
+
+    python benchmarks/bench_distillation.py
+"""
+import os
+import pickle
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from calorie_model import load_training_data, train_forest  # noqa: E402
+from model_distillation import distill, sample_input_grid  # noqa: E402
+
+
+def time_per_call(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def main():
+    X_train, y_train = load_training_data("calories.csv", "exercise.csv")
+
+    start = time.perf_counter()
+    teacher = train_forest(X_train, y_train)
+    teacher_fit = time.perf_counter() - start
+
+    start = time.perf_counter()
+    student, report = distill(teacher, reference=X_train)
+    student_fit = time.perf_counter() - start
+
+    one_row = sample_input_grid(1, teacher.feature_names_in_, random_state=1)
+    batch = sample_input_grid(10000, teacher.feature_names_in_, random_state=2)
+
+    print(f"{'':24}{'teacher':>12}{'student':>12}")
+    rows = [
+        ("fit / distill (s)", teacher_fit, student_fit),
+        ("1-row predict (ms)",
+         time_per_call(lambda: teacher.predict(one_row), 50) * 1e3,
+         time_per_call(lambda: student.predict(one_row), 50) * 1e3),
+        ("10k-row predict (ms)",
+         time_per_call(lambda: teacher.predict(batch), 5) * 1e3,
+         time_per_call(lambda: student.predict(batch), 5) * 1e3),
+        ("pickled size (kB)",
+         len(pickle.dumps(teacher)) / 1e3,
+         len(pickle.dumps(student)) / 1e3),
+    ]
+    for label, teacher_value, student_value in rows:
+        print(f"{label:24}{teacher_value:12.2f}{student_value:12.2f}")
+
+    print("\nStudent error against teacher on held-out inputs (kcal):")
+    for key, value in report.to_dict().items():
+        print(f"  {key}: {value:.2f}" if isinstance(value, float) else f"  {key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
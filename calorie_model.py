@@ -0,0 +1,43 @@
+from typing import Tuple
+
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+
+
+def load_training_data(calories_path: str = "calories.csv",
+                       exercise_path: str = "exercise.csv") -> Tuple[pd.DataFrame, pd.Series]:
+    """
+    Merge the exercise and calorie logs into model features and targets.
+
+    Args:
+        calories_path: CSV with User_ID and Calories columns
+        exercise_path: CSV with User_ID and the exercise/tracker columns
+
+    Returns:
+        Tuple of (feature frame, calorie series)
+    """
+    calories = pd.read_csv(calories_path)
+    exercise = pd.read_csv(exercise_path)
+
+    if len(calories) == 0 or len(exercise) == 0:
+        raise ValueError("Data files are empty")
+
+    exercise_df = exercise.merge(calories, on="User_ID").drop(columns="User_ID")
+    exercise_df["BMI"] = round(exercise_df["Weight"] / ((exercise_df["Height"] / 100) ** 2), 2)
+    exercise_df["Gender"] = exercise_df["Gender"].map({"Male": 1, "Female": 0})
+    exercise_df = pd.get_dummies(exercise_df, columns=["Activity_Level"], drop_first=True)
+
+    return exercise_df.drop("Calories", axis=1), exercise_df["Calories"]
+
+
+def train_forest(X: pd.DataFrame, y: pd.Series) -> RandomForestRegressor:
+    """Fit the calorie forest used for batch scoring and as distillation teacher."""
+    model = RandomForestRegressor(
+        n_estimators=200,
+        max_features=3,
+        max_depth=6,
+        n_jobs=-1,
+        random_state=42
+    )
+    model.fit(X, y)
+    return model
@@ -0,0 +1,95 @@
+from typing import Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+ACTIVITY_LEVELS = ["No activity", "Light walking", "Regular exercise"]
+DURATIONS = np.arange(0, 121, 1)
+HEART_RATE_BANDS = (80, 100, 120)
+ACTIVITY_PREFIX = "Activity_Level_"
+
+
+def has_activity_features(feature_names: Sequence[str]) -> bool:
+    """Whether the model was trained with one-hot Activity_Level columns."""
+    return any(str(name).startswith(ACTIVITY_PREFIX) for name in feature_names)
+
+
+def build_sweep_grid(profile: pd.DataFrame, feature_names: Sequence[str],
+                     durations: Sequence[float] = DURATIONS,
+                     activity_levels: Optional[Sequence[str]] = None,
+                     heart_rates: Sequence[float] = HEART_RATE_BANDS) -> pd.DataFrame:
+    """
+    Expand a single user profile into a what-if grid of model features.
+
+    Args:
+        profile: One-row frame as built from the sidebar inputs
+        feature_names: Columns the model was trained on
+        durations: Exercise durations to evaluate (minutes)
+        activity_levels: Activity levels to evaluate; by default all levels if the
+            model has Activity_Level columns, otherwise the axis is left out
+        heart_rates: Heart-rate bands to evaluate (bpm)
+
+    Returns:
+        Frame with one row per (duration, [activity level,] heart rate) combination,
+        aligned to feature_names and carrying the grid axes as index levels
+    """
+    feature_names = list(feature_names)
+    if activity_levels is None:
+        activity_levels = ACTIVITY_LEVELS if has_activity_features(feature_names) else []
+    sweep_activity = len(activity_levels) > 0
+    durations = np.asarray(durations, dtype=np.float64)
+    heart_rates = np.asarray(heart_rates, dtype=np.float64)
+    activity_codes = np.arange(len(activity_levels)) if sweep_activity else np.zeros(1, dtype=np.intp)
+
+    d, a, h = np.meshgrid(durations, activity_codes, heart_rates, indexing='ij')
+    d, a, h = d.ravel(), a.ravel(), h.ravel()
+
+    base = profile.reindex(columns=feature_names, fill_value=0).to_numpy(dtype=np.float64)[0]
+    X = np.repeat(base[np.newaxis, :], len(d), axis=0)
+    columns = {name: j for j, name in enumerate(feature_names)}
+    if 'Duration' in columns:
+        X[:, columns['Duration']] = d
+    if 'Heart_Rate' in columns:
+        X[:, columns['Heart_Rate']] = h
+    # One-hot activity columns as produced by pd.get_dummies in load_model()
+    for code, level in enumerate(activity_levels):
+        dummy = f"{ACTIVITY_PREFIX}{level}"
+        if dummy in columns:
+            X[:, columns[dummy]] = (a == code)
+
+    if sweep_activity:
+        index = pd.MultiIndex.from_arrays(
+            [d, np.asarray(activity_levels, dtype=object)[a], h],
+            names=['Duration', 'Activity_Level', 'Heart_Rate']
+        )
+    else:
+        index = pd.MultiIndex.from_arrays([d, h], names=['Duration', 'Heart_Rate'])
+    return pd.DataFrame(X, columns=feature_names, index=index)
+
+
+def sweep_calories(model, profile: pd.DataFrame, **grid_kwargs) -> pd.DataFrame:
+    """
+    Score the whole what-if grid with a single predict call.
+
+    Args:
+        model: Fitted regressor exposing `predict` and `feature_names_in_`
+        profile: One-row frame as built from the sidebar inputs
+        **grid_kwargs: Axis overrides forwarded to build_sweep_grid
+
+    Returns:
+        Long frame with Duration, Heart_Rate and Calories columns, plus
+        Activity_Level when that axis is swept
+    """
+    grid = build_sweep_grid(profile, model.feature_names_in_, **grid_kwargs)
+    calories = model.predict(grid)
+    result = grid.index.to_frame(index=False)
+    result['Calories'] = calories
+    return result
+
+
+def sweep_chart_data(sweep: pd.DataFrame) -> pd.DataFrame:
+    """Pivot a sweep into one column per heart-rate band (and activity level, if swept)."""
+    labels = sweep['Heart_Rate'].round().astype(int).astype(str) + " bpm"
+    if 'Activity_Level' in sweep.columns:
+        labels = sweep['Activity_Level'] + " @ " + labels
+    return sweep.assign(Series=labels).pivot(index='Duration', columns='Series', values='Calories')
@@ -0,0 +1,123 @@
+import threading
+import weakref
+from dataclasses import dataclass
+from typing import Dict, Sequence
+
+import numpy as np
+import pandas as pd
+
+_forest_arrays = weakref.WeakKeyDictionary()
+_forest_arrays_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class ForestArrays:
+    """All trees of a fitted forest packed into flat node arrays."""
+    roots: np.ndarray          # (n_trees,) index of each tree's root node
+    children: np.ndarray       # (n_nodes, 2) left/right child; leaves point to themselves
+    feature: np.ndarray        # (n_nodes,) split feature; 0 for leaves
+    threshold: np.ndarray      # (n_nodes,) split threshold
+    missing_left: np.ndarray   # (n_nodes,) whether NaN goes to the left child
+    value: np.ndarray          # (n_nodes,) node prediction
+    max_depth: int
+
+    # Rows evaluated per block so the (rows, trees) index arrays stay in cache
+    block_size = 256
+
+    @classmethod
+    def from_model(cls, model) -> "ForestArrays":
+        """Pack the `estimators_` of a fitted tree ensemble regressor."""
+        trees = [est.tree_ for est in model.estimators_]
+        sizes = np.array([tree.node_count for tree in trees])
+        offsets = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+
+        left, right, feature, threshold, missing_left, value = [], [], [], [], [], []
+        for tree, offset in zip(trees, offsets):
+            own = np.arange(tree.node_count) + offset
+            is_leaf = tree.children_left == -1
+            left.append(np.where(is_leaf, own, tree.children_left + offset))
+            right.append(np.where(is_leaf, own, tree.children_right + offset))
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(tree.threshold)
+            missing_left.append(getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count, dtype=np.uint8)))
+            value.append(tree.value[:, 0, 0])
+
+        return cls(
+            roots=offsets.astype(np.intp),
+            children=np.column_stack((np.concatenate(left), np.concatenate(right))).astype(np.intp),
+            feature=np.concatenate(feature).astype(np.intp),
+            threshold=np.concatenate(threshold).astype(np.float64),
+            missing_left=np.concatenate(missing_left).astype(bool),
+            value=np.concatenate(value).astype(np.float64),
+            max_depth=max(tree.max_depth for tree in trees),
+        )
+
+    def tree_predictions(self, X) -> np.ndarray:
+        """
+        Evaluate every tree on every row at once.
+
+        Args:
+            X: Feature matrix or frame aligned to the model's columns
+
+        Returns:
+            Array of shape (n_rows, n_trees) with each tree's leaf value
+        """
+        # The trees compare float32 inputs against float64 thresholds
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        n_rows, n_features = X.shape
+        has_missing = np.isnan(X).any()
+        # children[2 * node] is the left child, children[2 * node + 1] the right one
+        children = self.children.ravel()
+        out = np.empty((n_rows, self.roots.shape[0]), dtype=np.float64)
+        for start in range(0, n_rows, self.block_size):
+            block = X[start:start + self.block_size]
+            flat_X = block.ravel()
+            row_offsets = (np.arange(block.shape[0], dtype=np.intp) * n_features)[:, np.newaxis]
+            nodes = np.repeat(self.roots[np.newaxis, :], block.shape[0], axis=0)
+            for _ in range(self.max_depth):
+                x = flat_X.take(row_offsets + self.feature.take(nodes))
+                go_right = ~(x <= self.threshold.take(nodes))
+                if has_missing:
+                    go_right &= ~(np.isnan(x) & self.missing_left.take(nodes))
+                nodes = children.take(2 * nodes + go_right)
+            self.value.take(nodes, out=out[start:start + block.shape[0]])
+        return out
+
+
+def forest_arrays(model) -> ForestArrays:
+    """Return the packed trees of a model, building them once per model object."""
+    if isinstance(model, ForestArrays):
+        return model
+    if isinstance(getattr(model, 'arrays', None), ForestArrays):
+        return model.arrays
+    with _forest_arrays_lock:
+        arrays = _forest_arrays.get(model)
+    if arrays is None:
+        arrays = ForestArrays.from_model(model)
+        with _forest_arrays_lock:
+            _forest_arrays[model] = arrays
+    return arrays
+
+
+def predict_distribution(model, X: pd.DataFrame,
+                         quantiles: Sequence[float] = (0.05, 0.95)) -> Dict[str, np.ndarray]:
+    """
+    Summarise the spread of the individual tree predictions.
+
+    Args:
+        model: Fitted tree ensemble regressor, a model exposing packed `arrays`,
+            or a ForestArrays
+        X: Feature frame aligned to the model's columns
+        quantiles: Quantile levels of the per-tree predictions to report
+
+    Returns:
+        Dictionary with 'mean' and 'std' arrays (one value per row) and
+        'quantiles', an array of shape (n_rows, len(quantiles))
+    """
+    arrays = forest_arrays(model)
+    per_tree = arrays.tree_predictions(X)
+    return {
+        'mean': per_tree.mean(axis=1),
+        'std': per_tree.std(axis=1),
+        'quantiles': np.quantile(per_tree, quantiles, axis=1).T,
+    }
@@ -0,0 +1,290 @@
+import copy
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+
+# Measured calories outside (0, MAX_WORKOUT_CALORIES] are treated as entry errors
+MAX_WORKOUT_CALORIES = 2000.0
+
+
+def plausible_calories(calories) -> np.ndarray:
+    """Mask of measured calorie values that are finite, positive and not implausibly large."""
+    calories = np.asarray(calories, dtype=np.float64)
+    return np.isfinite(calories) & (calories > 0) & (calories <= MAX_WORKOUT_CALORIES)
+
+
+class SessionLog:
+    """Append-only CSV of logged workouts: model features plus measured calories."""
+
+    def __init__(self, path: str, feature_names: Sequence[str]):
+        self.path = path
+        self.feature_names = list(feature_names)
+        self._lock = threading.Lock()
+        self._offset = 0  # rows already handed out by read_new()
+
+    def append(self, X: pd.DataFrame, calories: Sequence[float]) -> int:
+        """
+        Append workouts; X is aligned to the model's feature columns.
+
+        Returns:
+            Number of workouts written; rows with implausible calories are dropped
+        """
+        records = X.reindex(columns=self.feature_names, fill_value=0).reset_index(drop=True)
+        records['Calories'] = np.asarray(calories, dtype=np.float64)
+        records = records[plausible_calories(records['Calories'])]
+        if len(records) == 0:
+            return 0
+        records['Logged_At'] = pd.Timestamp.now(tz='UTC').isoformat()
+        with self._lock:
+            write_header = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+            records.to_csv(self.path, mode='a', header=write_header, index=False)
+        return len(records)
+
+    def read_new(self) -> pd.DataFrame:
+        """Return the plausible workouts appended since the previous call."""
+        with self._lock:
+            if not os.path.exists(self.path):
+                return pd.DataFrame(columns=self.feature_names + ['Calories'])
+            records = pd.read_csv(self.path, skiprows=range(1, self._offset + 1))
+            self._offset += len(records)
+        return records[plausible_calories(records['Calories'])].reset_index(drop=True)
+
+    def read_all(self) -> pd.DataFrame:
+        """
+        Return every plausible workout logged so far and mark them all as consumed.
+
+        Used when a forest is fitted from scratch, so read_new() afterwards
+        only returns workouts the fit has not seen.
+        """
+        with self._lock:
+            if not os.path.exists(self.path):
+                return pd.DataFrame(columns=self.feature_names + ['Calories'])
+            records = pd.read_csv(self.path)
+            self._offset = len(records)
+        return records[plausible_calories(records['Calories'])].reset_index(drop=True)
+
+    def pending(self) -> int:
+        """Number of logged workouts not yet handed out by read_new()."""
+        with self._lock:
+            if not os.path.exists(self.path):
+                return 0
+            with open(self.path) as f:
+                total = max(sum(1 for _ in f) - 1, 0)
+            return total - self._offset
+
+
+def with_logged_workouts(X: pd.DataFrame, y: pd.Series, logged: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series]:
+    """
+    Append logged workouts (as returned by SessionLog.read_all) to training data.
+
+    Returns:
+        Tuple of (feature frame, calorie series) for a fit from scratch
+    """
+    if len(logged) == 0:
+        return X, y
+    return (pd.concat([X, logged.reindex(columns=X.columns, fill_value=0)], ignore_index=True),
+            pd.concat([y, logged['Calories']], ignore_index=True))
+
+
+def replace_oldest_trees(model: RandomForestRegressor, X_new: pd.DataFrame, y_new: Sequence[float],
+                         n_trees: int, random_state: Optional[int] = None) -> RandomForestRegressor:
+    """
+    Fit n_trees on the given rows and swap them in for the oldest trees.
+
+    The input model is left untouched so it can keep serving predictions;
+    the returned copy has the same number of trees.
+
+    Args:
+        model: Fitted forest
+        X_new: Feature rows aligned to the model's columns, usually new
+            workouts plus a replay sample of the original training data
+        y_new: Measured calories for X_new
+        n_trees: Number of trees to retire and retrain
+        random_state: Seed for the new trees
+
+    Returns:
+        Updated forest
+    """
+    n_trees = min(n_trees, len(model.estimators_))
+    fresh = RandomForestRegressor(**{**model.get_params(), 'n_estimators': n_trees, 'warm_start': False,
+                                     'random_state': random_state})
+    fresh.fit(X_new, y_new)
+
+    updated = copy.copy(model)
+    updated.estimators_ = list(model.estimators_[n_trees:]) + list(fresh.estimators_)
+    return updated
+
+
+def drift_report(old_model, new_model, X_holdout: pd.DataFrame, y_holdout: Sequence[float]) -> Dict[str, float]:
+    """
+    Compare two models on the same holdout.
+
+    Returns:
+        Dictionary with both models' MAE, the MAE change and the mean and
+        maximum absolute shift between their predictions (kcal)
+    """
+    y_holdout = np.asarray(y_holdout, dtype=np.float64)
+    old_pred = old_model.predict(X_holdout)
+    new_pred = new_model.predict(X_holdout)
+    old_mae = float(np.mean(np.abs(old_pred - y_holdout)))
+    new_mae = float(np.mean(np.abs(new_pred - y_holdout)))
+    shift = new_pred - old_pred
+    return {
+        'n_holdout': int(len(y_holdout)),
+        'mae_before': old_mae,
+        'mae_after': new_mae,
+        'mae_change': new_mae - old_mae,
+        'mean_shift': float(shift.mean()),
+        'max_abs_shift': float(np.abs(shift).max()),
+    }
+
+
+class IncrementalUpdater:
+    """
+    Keeps a forest up to date with logged workouts in a background thread.
+
+    Replacement trees are fitted on each new batch plus a replay sample of the
+    original training rows, so the forest does not forget them as old trees
+    are retired. An updated forest is only swapped in if its MAE on the
+    baseline and recent holdouts grows by at most max_mae_increase. The
+    interactive scorer built from an accepted forest is swapped in with it.
+    """
+
+    def __init__(self, model: RandomForestRegressor, log: SessionLog,
+                 baseline_holdout: Optional[pd.DataFrame] = None,
+                 baseline_targets: Optional[Sequence[float]] = None,
+                 replay_X: Optional[pd.DataFrame] = None,
+                 replay_y: Optional[Sequence[float]] = None,
+                 replay_ratio: float = 4.0, max_mae_increase: float = 1.0,
+                 make_scorer: Optional[Callable[[RandomForestRegressor], Any]] = None,
+                 trees_per_update: int = 20, min_records: int = 50,
+                 holdout_share: float = 0.2, recent_holdout_size: int = 5000,
+                 interval: float = 300.0, random_state: Optional[int] = None):
+        """
+        Args:
+            model: Fitted forest to start from
+            log: Log the new workouts are read from
+            baseline_holdout: Rows the forest was not trained on, for drift metrics
+            baseline_targets: Calories for baseline_holdout
+            replay_X: Original training rows mixed into every update
+            replay_y: Calories for replay_X
+            replay_ratio: Replay rows drawn per new workout
+            max_mae_increase: Largest MAE increase (kcal) on either holdout that
+                still lets an update through
+            make_scorer: Builds the interactive scorer of a forest (e.g. a distilled
+                student); called here and in the update thread, never on a request
+        """
+        self.log = log
+        self.trees_per_update = trees_per_update
+        self.min_records = min_records
+        self.holdout_share = holdout_share
+        self.recent_holdout_size = recent_holdout_size
+        self.interval = interval
+        self.baseline_holdout = baseline_holdout
+        self.baseline_targets = baseline_targets
+        self.replay_X = replay_X
+        self.replay_y = None if replay_y is None else np.asarray(replay_y, dtype=np.float64)
+        self.replay_ratio = replay_ratio
+        self.max_mae_increase = max_mae_increase
+        self.make_scorer = make_scorer
+        self.history: List[Dict[str, float]] = []
+        self._model = model
+        self._scorer = model if make_scorer is None else make_scorer(model)
+        self._lock = threading.Lock()
+        self._update_lock = threading.Lock()
+        self._rng = np.random.default_rng(random_state)
+        self._recent_X = pd.DataFrame(columns=log.feature_names)
+        self._recent_y = np.empty(0)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def model(self) -> RandomForestRegressor:
+        """The most recent forest."""
+        with self._lock:
+            return self._model
+
+    def snapshot(self) -> Tuple[RandomForestRegressor, Any]:
+        """The most recent forest and the scorer built from it, read together."""
+        with self._lock:
+            return self._model, self._scorer
+
+    def update_now(self) -> Optional[Dict[str, float]]:
+        """
+        Fold any newly logged workouts into the forest.
+
+        Returns:
+            Drift metrics for this update, with 'accepted' telling whether the
+            updated forest was swapped in, or None if fewer than min_records
+            workouts were waiting
+        """
+        with self._update_lock:
+            if self.log.pending() < self.min_records:
+                return None
+            records = self.log.read_new()
+            if len(records) == 0:
+                return None
+            X_new = records.reindex(columns=self.log.feature_names, fill_value=0)
+            y_new = records['Calories'].to_numpy(dtype=np.float64)
+
+            # Part of every batch is kept back to measure drift on recent sessions
+            held_out = self._rng.random(len(records)) < self.holdout_share
+            if held_out.all():
+                held_out[:] = False
+            X_fit, y_fit = X_new[~held_out], y_new[~held_out]
+            if self.replay_X is not None and len(self.replay_X):
+                n_replay = min(int(round(len(y_fit) * self.replay_ratio)), len(self.replay_X))
+                replay = self._rng.choice(len(self.replay_X), size=n_replay, replace=False)
+                X_fit = pd.concat([X_fit, self.replay_X.iloc[replay]], ignore_index=True)
+                y_fit = np.concatenate([y_fit, self.replay_y[replay]])
+            old_model = self.model
+            new_model = replace_oldest_trees(old_model, X_fit, y_fit, self.trees_per_update,
+                                             random_state=int(self._rng.integers(2 ** 31)))
+
+            self._recent_X = pd.concat([self._recent_X, X_new[held_out]], ignore_index=True).tail(self.recent_holdout_size)
+            self._recent_y = np.concatenate([self._recent_y, y_new[held_out]])[-self.recent_holdout_size:]
+
+            metrics = {'timestamp': time.time(), 'n_new': int((~held_out).sum())}
+            if len(self._recent_y):
+                metrics.update({f"recent_{k}": v for k, v in
+                                drift_report(old_model, new_model, self._recent_X, self._recent_y).items()})
+            if self.baseline_holdout is not None:
+                metrics.update({f"baseline_{k}": v for k, v in
+                                drift_report(old_model, new_model, self.baseline_holdout, self.baseline_targets).items()})
+
+            metrics['accepted'] = all(metrics.get(f"{holdout}_mae_change", 0.0) <= self.max_mae_increase
+                                      for holdout in ('recent', 'baseline'))
+            if metrics['accepted']:
+                new_scorer = new_model if self.make_scorer is None else self.make_scorer(new_model)
+                with self._lock:
+                    self._model, self._scorer = new_model, new_scorer
+            else:
+                print(f"Incremental update rejected: MAE grew by more than {self.max_mae_increase} kcal")
+            self.history.append(metrics)
+            return metrics
+
+    def start(self) -> None:
+        """Check the log every `interval` seconds in a daemon thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="incremental-updater", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread after its current update."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.update_now()
+            except Exception as e:
+                print(f"Error in incremental update: {str(e)}")
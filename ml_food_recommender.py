@@ -3,6 +3,7 @@ import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import linear_kernel
 import random
+from typing import Dict, Optional, Sequence
 
 class MLFoodRecommender:
     def __init__(self):
@@ -41,6 +42,58 @@ class MLFoodRecommender:
         self.food_data['features'] = self.food_data['food'] + ' ' + self.food_data['meal_type'] + ' ' + self.food_data['diet_type']
         self.tfidf_matrix = self.vectorizer.fit_transform(self.food_data['features'])
         self.cosine_sim = linear_kernel(self.tfidf_matrix, self.tfidf_matrix)
+        # Column arrays used for ranking without per-request DataFrame copies
+        self._diet_types = self.food_data['diet_type'].str.lower().to_numpy()
+        self._food_calories = self.food_data['calories'].to_numpy()
+        self._food_protein = self.food_data['protein'].to_numpy()
+    
+    @staticmethod
+    def _sort_order(values: np.ndarray, ascending: bool) -> np.ndarray:
+        """Positions that sort values, with ties in the same order as DataFrame.sort_values"""
+        if ascending:
+            return np.argsort(values, kind='quicksort')
+        # pandas sorts the reversed values ascending and reverses the result back
+        reversed_order = np.argsort(values[::-1], kind='quicksort')
+        return (len(values) - 1 - reversed_order)[::-1]
+    
+    def _rank_foods(self, bmi_category: str, activity_level: str, diet_preference: str,
+                    n_recommendations: int, random_state: Optional[int] = 42) -> np.ndarray:
+        """
+        Rank foods for one profile
+        
+        Args:
+            bmi_category: User's BMI category
+            activity_level: User's activity level
+            diet_preference: User's dietary preference
+            n_recommendations: Number of recommendations to return
+            random_state: Seed for the variety sample; None for a fresh sample
+            
+        Returns:
+            Row positions in food_data of the recommended foods, best first
+        """
+        # Filter by diet preference
+        candidates = np.arange(len(self.food_data))
+        if diet_preference.lower() != 'no preference':
+            candidates = candidates[self._diet_types == diet_preference.lower()]
+        
+        if len(candidates) == 0:
+            candidates = np.arange(len(self.food_data))  # Fallback to all foods if no matches
+        
+        # Get random sample for variety (same draw as DataFrame.sample)
+        if len(candidates) > n_recommendations:
+            rng = np.random.RandomState(random_state)
+            candidates = candidates[rng.choice(len(candidates), size=n_recommendations, replace=False)]
+        
+        # Sort by nutritional value based on BMI and activity
+        if bmi_category.lower() in ['underweight']:
+            candidates = candidates[self._sort_order(self._food_calories[candidates], ascending=False)]
+        elif bmi_category.lower() in ['overweight', 'obese']:
+            candidates = candidates[self._sort_order(self._food_calories[candidates], ascending=True)]
+        
+        if 'active' in activity_level.lower():
+            candidates = candidates[self._sort_order(self._food_protein[candidates], ascending=False)]
+        
+        return candidates[:n_recommendations]
     
     def get_recommendations(self, bmi_category: str, activity_level: str, diet_preference: str, n_recommendations: int = 5):
         """
@@ -56,32 +109,12 @@ class MLFoodRecommender:
             List of recommended food items with details
         """
         try:
-            # Filter by diet preference
-            filtered_foods = self.food_data.copy()
-            if diet_preference.lower() != 'no preference':
-                filtered_foods = filtered_foods[
-                    filtered_foods['diet_type'].str.lower() == diet_preference.lower()
-                ]
-            
-            if len(filtered_foods) == 0:
-                filtered_foods = self.food_data  # Fallback to all foods if no matches
-            
-            # Get random sample for variety
-            if len(filtered_foods) > n_recommendations:
-                filtered_foods = filtered_foods.sample(n=n_recommendations, random_state=42)
-            
-            # Sort by nutritional value based on BMI and activity
-            if bmi_category.lower() in ['underweight']:
-                filtered_foods = filtered_foods.sort_values('calories', ascending=False)
-            elif bmi_category.lower() in ['overweight', 'obese']:
-                filtered_foods = filtered_foods.sort_values('calories')
-            
-            if 'active' in activity_level.lower():
-                filtered_foods = filtered_foods.sort_values('protein', ascending=False)
+            ranked = self._rank_foods(bmi_category, activity_level, diet_preference, n_recommendations)
+            filtered_foods = self.food_data.iloc[ranked]
             
             # Format recommendations
             recommendations = []
-            for _, row in filtered_foods.head(n_recommendations).iterrows():
+            for _, row in filtered_foods.iterrows():
                 recommendations.append({
                     'food': row['food'],
                     'meal_type': row['meal_type'],
@@ -108,6 +141,71 @@ class MLFoodRecommender:
             # Return some default recommendations in case of error
             return self._get_default_recommendations()
     
+    def get_batch_recommendations(self, bmi_categories: Sequence[str], activity_levels: Sequence[str],
+                                  diet_preferences: Sequence[str], predicted_calories: Optional[Sequence[float]] = None,
+                                  n_recommendations: int = 5, random_state: Optional[int] = 42) -> Dict[str, np.ndarray]:
+        """
+        Get food recommendations for many user profiles at once
+        
+        Identical profiles are ranked once and share the result. With the default
+        random_state every profile gets exactly what get_recommendations returns.
+        
+        Args:
+            bmi_categories: BMI category per user
+            activity_levels: Activity level per user
+            diet_preferences: Dietary preference per user
+            predicted_calories: Predicted calories burned per user, passed through to
+                the output (the ranking does not depend on it)
+            n_recommendations: Number of recommendations per user
+            random_state: Seed for the variety sample; None samples each distinct
+                profile afresh
+            
+        Returns:
+            Dictionary of columns with one row per user: 'food', 'meal_type',
+            'calories', 'protein', 'carbs', 'fat' and 'fiber' of shape
+            (n_users, n_recommendations), padded with None/NaN when fewer foods
+            match, 'n_items' per user and 'predicted_calories' if given
+        """
+        columns = [np.asarray(bmi_categories, dtype=object), np.asarray(activity_levels, dtype=object),
+                   np.asarray(diet_preferences, dtype=object)]
+        n_users = len(columns[0])
+        if any(len(col) != n_users for col in columns[1:]):
+            raise ValueError("bmi_categories, activity_levels and diet_preferences must have the same length")
+        if predicted_calories is not None and len(predicted_calories) != n_users:
+            raise ValueError("predicted_calories must have one value per user")
+        
+        # Factorize each column and combine the codes into one profile id
+        codes, uniques = zip(*(pd.factorize(col, use_na_sentinel=True) for col in columns))
+        profile_ids = np.zeros(n_users, dtype=np.int64)
+        for col_codes, col_uniques in zip(codes, uniques):
+            profile_ids = profile_ids * (len(col_uniques) + 1) + (col_codes + 1)
+        distinct, first_user, inverse = np.unique(profile_ids, return_index=True, return_inverse=True)
+        
+        # Rank once per distinct profile
+        table = np.full((len(distinct), n_recommendations), -1, dtype=np.intp)
+        for group, user in enumerate(first_user):
+            profile = [col[user] for col in columns]
+            if all(isinstance(value, str) for value in profile):
+                ranked = self._rank_foods(*profile, n_recommendations, random_state=random_state)
+            else:
+                # Same fallback as the single-profile path
+                ranked = np.random.RandomState(42).choice(len(self.food_data), size=3, replace=False)
+            ranked = ranked[:n_recommendations]
+            table[group, :len(ranked)] = ranked
+        
+        food_index = table[inverse.ravel()]
+        present = food_index >= 0
+        result = {'n_items': present.sum(axis=1)}
+        for name in ['food', 'meal_type']:
+            values = np.append(self.food_data[name].to_numpy(dtype=object), None)
+            result[name] = values[food_index]
+        for name in ['calories', 'protein', 'carbs', 'fat', 'fiber']:
+            values = np.append(self.food_data[name].to_numpy(dtype=np.float64), np.nan)
+            result[name] = values[food_index]
+        if predicted_calories is not None:
+            result['predicted_calories'] = np.asarray(predicted_calories, dtype=np.float64)
+        return result
+    
     def _get_default_recommendations(self):
         """Provide default recommendations in case of errors"""
         default_foods = self.food_data.sample(n=3, random_state=42)
@@ -0,0 +1,113 @@
+from dataclasses import dataclass, asdict
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import HistGradientBoostingRegressor
+
+# (min, max, step) of the sidebar input widgets in app.py
+INPUT_RANGES = {
+    'Gender': (0, 1, 1),
+    'Age': (10, 100, 1),
+    'Height': (100, 250, 1),
+    'Weight': (30, 200, 1),
+    'Duration': (0, 120, 1),
+    'Body_Temp': (35.0, 42.0, 0.1),
+    'Heart_Rate': (40, 200, 1),
+    'Steps_Taken': (0, 50000, 100),
+    'Kms_Walked': (0.0, 50.0, 0.1),
+    'Pulse_Rate': (40, 200, 1),
+    'Hours_Slept': (0.0, 24.0, 0.1),
+    'Blood_Oxygen': (70, 100, 1),
+    'Water_Intake': (0.0, 10.0, 0.1),
+}
+
+# Inputs that are only shown (and otherwise sent as 0) when a fitness tracker is used
+TRACKER_FEATURES = ['Heart_Rate', 'Steps_Taken', 'Kms_Walked', 'Pulse_Rate', 'Hours_Slept', 'Blood_Oxygen']
+
+
+@dataclass
+class DistillationReport:
+    """Agreement between student and teacher on held-out inputs (kcal)."""
+    mae: float
+    rmse: float
+    p95_abs_error: float
+    max_abs_error: float
+    n_train: int
+    n_eval: int
+
+    def to_dict(self) -> Dict[str, float]:
+        return asdict(self)
+
+
+def sample_input_grid(n_samples: int, feature_names: Sequence[str],
+                      random_state: Optional[int] = 0, tracker_share: float = 0.5) -> pd.DataFrame:
+    """
+    Draw synthetic profiles on the widget grid of every input.
+
+    Args:
+        n_samples: Number of profiles to draw
+        feature_names: Columns the teacher was trained on
+        random_state: Seed for reproducible grids
+        tracker_share: Fraction of profiles that fill in the tracker inputs
+
+    Returns:
+        Frame of synthetic profiles aligned to feature_names
+    """
+    rng = np.random.default_rng(random_state)
+    columns = {}
+    for name, (low, high, step) in INPUT_RANGES.items():
+        n_steps = int(round((high - low) / step))
+        columns[name] = low + rng.integers(0, n_steps + 1, n_samples) * step
+    tracker_off = rng.random(n_samples) >= tracker_share
+    for name in TRACKER_FEATURES:
+        columns[name] = np.where(tracker_off, 0, columns[name])
+
+    grid = pd.DataFrame(columns)
+    grid['BMI'] = (grid['Weight'] / ((grid['Height'] / 100) ** 2)).round(2)
+    return grid.reindex(columns=list(feature_names), fill_value=0)
+
+
+def distill(teacher, reference: Optional[pd.DataFrame] = None, n_samples: int = 40000,
+            random_state: int = 0) -> Tuple[HistGradientBoostingRegressor, DistillationReport]:
+    """
+    Train a compact student model on the teacher's predictions.
+
+    Args:
+        teacher: Fitted regressor exposing `predict` and `feature_names_in_`
+        reference: Real feature rows (e.g. the training set) added to the synthetic grid
+        n_samples: Number of synthetic profiles to label with the teacher
+        random_state: Seed for the grid, the split and the student
+
+    Returns:
+        Tuple of (fitted student, report of its error against the teacher on a
+        held-out 20% of the labelled inputs)
+    """
+    feature_names = list(teacher.feature_names_in_)
+    inputs = sample_input_grid(n_samples, feature_names, random_state=random_state)
+    if reference is not None:
+        inputs = pd.concat([inputs, reference.reindex(columns=feature_names, fill_value=0)],
+                           ignore_index=True)
+    targets = teacher.predict(inputs)
+
+    rng = np.random.default_rng(random_state)
+    held_out = rng.random(len(inputs)) < 0.2
+
+    student = HistGradientBoostingRegressor(
+        max_iter=200,
+        max_depth=4,
+        early_stopping=False,
+        random_state=random_state
+    )
+    student.fit(inputs[~held_out], targets[~held_out])
+
+    errors = np.abs(student.predict(inputs[held_out]) - targets[held_out])
+    report = DistillationReport(
+        mae=float(errors.mean()),
+        rmse=float(np.sqrt(np.mean(errors ** 2))),
+        p95_abs_error=float(np.quantile(errors, 0.95)),
+        max_abs_error=float(errors.max()),
+        n_train=int((~held_out).sum()),
+        n_eval=int(held_out.sum()),
+    )
+    return student, report
@@ -0,0 +1,152 @@
+import hashlib
+import pickle
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Step sizes of the sidebar input widgets; features are snapped to these
+# before being used as cache keys so equivalent profiles share an entry.
+FEATURE_STEPS = {
+    'Gender': 1,
+    'Age': 1,
+    'Height': 1,
+    'Weight': 1,
+    'BMI': 0.01,
+    'Duration': 1,
+    'Heart_Rate': 1,
+    'Body_Temp': 0.1,
+    'Steps_Taken': 100,
+    'Kms_Walked': 0.1,
+    'Pulse_Rate': 1,
+    'Hours_Slept': 0.1,
+    'Blood_Oxygen': 1,
+    'Water_Intake': 0.1,
+}
+
+_model_versions = weakref.WeakKeyDictionary()
+_model_versions_lock = threading.Lock()
+
+
+def model_version(model) -> str:
+    """Return a content fingerprint of a fitted model, computed once per object."""
+    # Models loaded from a published snapshot already know their version
+    version = getattr(model, 'version_', None)
+    if version is not None:
+        return version
+    with _model_versions_lock:
+        version = _model_versions.get(model)
+    if version is None:
+        version = hashlib.sha1(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)).hexdigest()
+        with _model_versions_lock:
+            _model_versions[model] = version
+    return version
+
+
+def quantize_features(X: pd.DataFrame, steps: Optional[Dict[str, float]] = None) -> np.ndarray:
+    """
+    Snap each feature column to its widget step size.
+
+    Args:
+        X: Engineered feature frame, one row per profile
+        steps: Step size per column name; columns without a step are compared exactly
+
+    Returns:
+        Integer array of shape (n_rows, n_features) holding the quantized values
+        (unknown columns keep their raw bit pattern)
+    """
+    steps = FEATURE_STEPS if steps is None else steps
+    values = X.to_numpy(dtype=np.float64)
+    quantized = np.empty(values.shape, dtype=np.int64)
+    for j, column in enumerate(X.columns):
+        step = steps.get(column)
+        if step:
+            quantized[:, j] = np.round(np.nan_to_num(values[:, j], nan=-1.0) / step).astype(np.int64)
+        else:
+            quantized[:, j] = values[:, j].view(np.int64)
+    return quantized
+
+
+class PredictionCache:
+    """Thread-safe LRU cache of model predictions keyed on quantized features."""
+
+    def __init__(self, maxsize: int = 4096, steps: Optional[Dict[str, float]] = None):
+        if maxsize <= 0:
+            raise ValueError("maxsize must be positive")
+        self.maxsize = maxsize
+        self.steps = FEATURE_STEPS if steps is None else steps
+        self._entries: "OrderedDict[Tuple[Hashable, ...], float]" = OrderedDict()
+        self._version: Optional[str] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def predict(self, model, X: pd.DataFrame) -> np.ndarray:
+        """
+        Predict through the cache, calling the model once for all missing rows.
+
+        Args:
+            model: Fitted regressor exposing `predict`
+            X: Feature frame already aligned to the model's columns
+
+        Returns:
+            Array of predictions, one per row of X
+        """
+        version = model_version(model)
+        quantized = quantize_features(X, self.steps)
+        keys = [tuple(row) for row in quantized.tolist()]
+        predictions = np.empty(len(keys), dtype=np.float64)
+        missing = []
+
+        with self._lock:
+            if version != self._version:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self._version = version
+            for i, key in enumerate(keys):
+                value = self._entries.get(key)
+                if value is None:
+                    missing.append(i)
+                else:
+                    self._entries.move_to_end(key)
+                    predictions[i] = value
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            predictions[missing] = model.predict(X.iloc[missing])
+            with self._lock:
+                # Another session may have swapped the model while we predicted
+                if version == self._version:
+                    for i in missing:
+                        self._entries[keys[i]] = float(predictions[i])
+                        self._entries.move_to_end(keys[i])
+                    while len(self._entries) > self.maxsize:
+                        self._entries.popitem(last=False)
+
+        return predictions
+
+    def clear(self) -> None:
+        """Drop all cached predictions and reset the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+            self.hits = self.misses = self.invalidations = 0
+
+    def stats(self) -> Dict[str, float]:
+        """Return hit/miss counters and the current fill level."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'invalidations': self.invalidations,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+            }
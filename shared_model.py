@@ -0,0 +1,252 @@
+"""Share one fitted forest between app worker processes through mmap'd files.
+
+One process publishes the forest's packed node arrays, and the compact
+student distilled from it, into a version directory. Every worker maps the
+same arrays read-only, so the operating system keeps a single copy of the
+trees in the page cache however many workers are running, and no worker
+trains or distills on its own.
+
+Layout of the model directory:
+
+    current.json                     pointer to the live version (replaced atomically)
+    versions/<version>/*.npy         packed arrays of one forest, never modified
+    versions/<version>/student.pkl   distilled student for interactive scoring
+    publish.lock                     held while a process trains and publishes
+
+Only entries of versions/ named like a version are ever deleted.
+
+Publish or swap the version from the command line, folding in the
+workouts logged so far:
+
+    python shared_model.py <model_dir> [session_log.csv]
+"""
+import json
+import os
+import pickle
+import re
+import shutil
+import sys
+import threading
+from contextlib import contextmanager
+from dataclasses import fields
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from forest_uncertainty import ForestArrays
+from model_distillation import distill
+from prediction_cache import model_version
+
+try:
+    import fcntl
+    msvcrt = None
+except ImportError:  # Windows: lock the first byte of the lock file instead
+    fcntl = None
+    import msvcrt
+
+POINTER_FILE = "current.json"
+LOCK_FILE = "publish.lock"
+VERSIONS_DIR = "versions"
+STUDENT_FILE = "student.pkl"
+VERSION_PATTERN = re.compile(r"^[0-9a-f]{16}((\.[0-9]+)?\.tmp)?$")
+ARRAY_FIELDS = [f.name for f in fields(ForestArrays) if f.name != 'max_depth']
+
+
+@contextmanager
+def publish_lock(directory: str):
+    """Hold an exclusive lock on the model directory; released by the OS if the holder crashes."""
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, LOCK_FILE), 'a') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        else:
+            lock_file.seek(0)
+            while True:
+                try:
+                    # LK_LOCK gives up after about 10 s; training can take longer
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def read_pointer(directory: str) -> Optional[dict]:
+    """Return the manifest of the live version, or None if nothing is published."""
+    try:
+        with open(os.path.join(directory, POINTER_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def publish_forest(model, directory: str, reference: Optional[pd.DataFrame] = None, keep: int = 2) -> str:
+    """
+    Write a fitted forest's packed arrays and its distilled student, and make them the live version.
+
+    The caller is expected to hold publish_lock(directory), but concurrent
+    publishers of the same version are still safe. If distillation
+    fails, the version is published without a student and workers score
+    with the forest.
+
+    Args:
+        model: Fitted tree ensemble regressor
+        directory: Model directory shared by the workers
+        reference: Real feature rows added to the distillation grid
+        keep: Number of most recent versions to keep on disk
+
+    Returns:
+        The published version
+    """
+    version = model_version(model)[:16]
+    arrays = ForestArrays.from_model(model)
+    versions_dir = os.path.join(directory, VERSIONS_DIR)
+    target = os.path.join(versions_dir, version)
+
+    if not os.path.isdir(target):
+        # Staging is per process, so publishers that race never share files
+        staging = f"{target}.{os.getpid()}.tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        for name in ARRAY_FIELDS:
+            np.save(os.path.join(staging, f"{name}.npy"), np.ascontiguousarray(getattr(arrays, name)))
+        try:
+            student, report = distill(model, reference=reference)
+            with open(os.path.join(staging, STUDENT_FILE), 'wb') as f:
+                pickle.dump({'model': student, 'report': report.to_dict()}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            print(f"Error in publish_forest distillation: {str(e)}")
+        try:
+            os.replace(staging, target)
+        except OSError:
+            # Another publisher moved the same version in first; its copy is identical
+            if not os.path.isdir(target):
+                raise
+            shutil.rmtree(staging, ignore_errors=True)
+
+    manifest = {
+        'version': version,
+        'max_depth': arrays.max_depth,
+        'feature_names': [str(name) for name in model.feature_names_in_],
+        'history': ([version] + [v for v in (read_pointer(directory) or {}).get('history', []) if v != version])[:keep],
+    }
+    pointer_tmp = os.path.join(directory, f"{POINTER_FILE}.{os.getpid()}.tmp")
+    with open(pointer_tmp, 'w') as f:
+        json.dump(manifest, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer_tmp, os.path.join(directory, POINTER_FILE))
+
+    prune_versions(directory, manifest['history'])
+    return version
+
+
+def prune_versions(directory: str, keep: List[str]) -> None:
+    """
+    Delete superseded versions and staging leftovers of crashed publishers.
+
+    Only entries of the versions/ subdirectory whose names match the version
+    pattern are considered; anything else in the model directory is left alone.
+    Workers still mapping a deleted version keep reading it until they detach;
+    on Windows, directories that are still mapped are skipped.
+    """
+    versions_dir = os.path.join(directory, VERSIONS_DIR)
+    if not os.path.isdir(versions_dir):
+        return
+    for entry in os.listdir(versions_dir):
+        path = os.path.join(versions_dir, entry)
+        if VERSION_PATTERN.match(entry) and os.path.isdir(path) and entry not in keep:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+class SharedForest:
+    """Read-only forest backed by mmap'd arrays of one published version."""
+
+    def __init__(self, directory: str, manifest: dict):
+        self.directory = directory
+        self.version_ = manifest['version']
+        self.feature_names_in_ = np.asarray(manifest['feature_names'], dtype=object)
+        path = os.path.join(directory, VERSIONS_DIR, self.version_)
+        self.arrays = ForestArrays(
+            max_depth=manifest['max_depth'],
+            **{name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r') for name in ARRAY_FIELDS}
+        )
+        # The student is small and published alongside, so each worker just loads it
+        self.student = None
+        self.student_report: Optional[dict] = None
+        student_path = os.path.join(path, STUDENT_FILE)
+        if os.path.exists(student_path):
+            with open(student_path, 'rb') as f:
+                published = pickle.load(f)
+            self.student, self.student_report = published['model'], published['report']
+
+    @classmethod
+    def attach(cls, directory: str) -> "SharedForest":
+        """Map the live version of the model directory."""
+        manifest = read_pointer(directory)
+        if manifest is None:
+            raise FileNotFoundError(f"No model published in {directory}")
+        return cls(directory, manifest)
+
+    def predict(self, X: pd.DataFrame) -> np.ndarray:
+        """Mean of the tree predictions, as RandomForestRegressor.predict."""
+        return self.arrays.tree_predictions(X).mean(axis=1)
+
+
+class ModelHost:
+    """Hands out the live SharedForest of a model directory, following version swaps."""
+
+    def __init__(self, directory: str, train: Callable[[], Tuple[object, Optional[pd.DataFrame]]]):
+        """
+        Args:
+            directory: Model directory shared by the workers
+            train: Returns a fitted forest and the feature rows it was trained on,
+                called only if no version has been published yet
+        """
+        self.directory = directory
+        self.train = train
+        self._lock = threading.Lock()
+        self._forest: Optional[SharedForest] = None
+
+    def current(self) -> SharedForest:
+        """
+        Return the live forest, training and publishing it first if no process has yet.
+
+        A new SharedForest object is returned after a version swap, so caches keyed
+        on the model object or its version pick up the change.
+        """
+        with self._lock:
+            manifest = read_pointer(self.directory)
+            if manifest is None:
+                # Only one worker trains; the others wait for the lock and find it published
+                with publish_lock(self.directory):
+                    if read_pointer(self.directory) is None:
+                        model, reference = self.train()
+                        publish_forest(model, self.directory, reference=reference)
+                manifest = read_pointer(self.directory)
+            if self._forest is None or self._forest.version_ != manifest['version']:
+                self._forest = SharedForest(self.directory, manifest)
+            return self._forest
+
+
+if __name__ == "__main__":
+    from calorie_model import load_training_data, train_forest
+    from incremental_model import SessionLog, with_logged_workouts
+
+    if len(sys.argv) not in (2, 3):
+        sys.exit("usage: python shared_model.py <model_dir> [session_log.csv]")
+    model_dir = sys.argv[1]
+    log_path = sys.argv[2] if len(sys.argv) == 3 else "session_log.csv"
+    X_train, y_train = load_training_data("calories.csv", "exercise.csv")
+    X_train, y_train = with_logged_workouts(X_train, y_train, SessionLog(log_path, X_train.columns).read_all())
+    with publish_lock(model_dir):
+        published = publish_forest(train_forest(X_train, y_train), model_dir, reference=X_train)
+    print(f"Published model version {published} to {model_dir}")
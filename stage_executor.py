@@ -0,0 +1,70 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, Optional
+
+
+@dataclass
+class StageResult:
+    """Outcome of one independent stage of a page run."""
+    name: str
+    value: Any = None
+    error: Optional[BaseException] = None
+    timed_out: bool = False
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and not self.timed_out
+
+
+class StageExecutor:
+    """
+    Runs independent stages on a shared thread pool and yields them as they finish.
+
+    A stage that raises an Exception is reported as failed. Other exceptions, such
+    as Streamlit's rerun requests, propagate to the caller when the result is yielded.
+    """
+
+    def __init__(self, max_workers: int = 8):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="stage")
+
+    @staticmethod
+    def _run_stage(name: str, fn: Callable[[], Any]) -> StageResult:
+        start = time.perf_counter()
+        try:
+            value = fn()
+        except Exception as e:
+            return StageResult(name, error=e, elapsed=time.perf_counter() - start)
+        return StageResult(name, value=value, elapsed=time.perf_counter() - start)
+
+    def run(self, stages: Dict[str, Callable[[], Any]], timeout: Optional[float] = None) -> Iterator[StageResult]:
+        """
+        Start every stage at once and yield each result as soon as it is ready.
+
+        Args:
+            stages: Zero-argument callables keyed by stage name
+            timeout: Seconds to wait for all stages; stages still running then are
+                yielded as timed out. They are abandoned, not cancelled: a stage
+                that has started keeps its pool thread until it returns
+
+        Returns:
+            Iterator of StageResult in completion order, one per stage
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        pending = {self._pool.submit(self._run_stage, name, fn): name for name, fn in stages.items()}
+
+        while pending:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            done, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            if not done:
+                for future, name in pending.items():
+                    future.cancel()  # only stops stages that have not started yet
+                    yield StageResult(name, timed_out=True, elapsed=timeout)
+                return
+            for future in done:
+                del pending[future]
+                yield future.result()
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)